@@ -2,40 +2,660 @@
 """
 Sistema di Backup Incrementale
 Copia file da una cartella origine a una destinazione, tenendo traccia
-dei cambiamenti tramite un file JSON per copie incrementali successive.
+dei cambiamenti tramite un database SQLite per copie incrementali successive.
 """
 
 import os
+import gc
+import errno
 import sys
 import json
 import hashlib
+import mmap
 import shutil
+import threading
+import time
+import sqlite3
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Set, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fastcdc
+except ImportError:
+    fastcdc = None
+
+
+# Strategie di rilevamento delle modifiche:
+# - DELTA_ALWAYS ricalcola l'hash di ogni file ad ogni scansione
+# - DELTA_TRUST_INCREMENTAL riusa l'hash dell'ultimo backup se dimensione
+#   e data di modifica del file non sono cambiate (euristica di rsync)
+DELTA_ALWAYS = "always"
+DELTA_TRUST_INCREMENTAL = "trust_incremental"
+
+# Numero predefinito di thread per il calcolo degli hash: hashlib rilascia
+# il GIL durante l'aggiornamento, quindi i thread lavorano in parallelo
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Sotto questa soglia di file da elaborare il costo di avvio del pool
+# supera il guadagno, e l'hash viene calcolato in sequenza
+PARALLEL_THRESHOLD = 32
+
+# Numero predefinito di copie contemporanee: su dischi locali più copie in
+# parallelo competono per lo stesso disco, su dischi di rete conviene
+# aumentarlo con --concurrency
+DEFAULT_CONCURRENCY = 2
+
+# Elementi inviati a un pool di thread in anticipo, per ogni thread: basta
+# a tenerli sempre occupati senza creare subito un future per ogni file
+PENDING_PER_WORKER = 4
+
+# Algoritmo di hash: BLAKE3 se il modulo è installato (molto più veloce
+# grazie alle istruzioni SIMD), altrimenti MD5 dalla libreria standard.
+# I metadati salvati con un algoritmo diverso non sono confrontabili.
+DEFAULT_HASH_ALGO = "blake3" if blake3 is not None else "md5"
+
+# Algoritmi di hashlib tra cui scegliere senza BLAKE3: SHA-256 è più veloce
+# di MD5 sulle CPU con estensioni SHA-NI, e più resistente alle collisioni
+HASHLIB_ALGOS = ("sha256", "md5")
+
+# Dimensione dei blocchi letti durante il calcolo dell'hash: blocchi grandi
+# riducono il numero di chiamate read() e di passaggi nell'interprete
+READ_BUFFER_SIZE = 1 << 20
+
+# Oltre questa dimensione il file viene mappato in memoria e passato a
+# hashlib in un'unica chiamata, senza copie in oggetti Python intermedi
+MMAP_THRESHOLD = 1 << 20
+
+# Dimensioni minima, media e massima dei blocchi a lunghezza variabile
+# (content-defined chunking) usati con l'opzione --cdc
+CDC_MIN_SIZE = 256 * 1024
+CDC_AVG_SIZE = 1024 * 1024
+CDC_MAX_SIZE = 4 * 1024 * 1024
+
+# Algoritmo con cui vengono nominati i blocchi di --cdc. È indipendente da
+# quello usato per rilevare le modifiche, che può essere MD5: un blocco già
+# presente non viene riscritto, quindi una collisione ripristinerebbe in
+# silenzio dati sbagliati
+CHUNK_HASH_ALGO = "blake3" if blake3 is not None else "sha256"
+
+# Errori con cui copy_file_range e sendfile segnalano di non poter copiare
+# tra i due file (filesystem diversi, tipo di file o sistema non supportati):
+# si passa al metodo di copia successivo
+_FAST_COPY_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL,
+    errno.ENOTSOCK,
+}
+
+# Struttura del database dei metadati: una tabella chiave/valore per le
+# informazioni sull'ultimo backup e una riga per ogni file, in modo che un
+# backup incrementale aggiorni solo le righe dei file cambiati
+METADATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    rel TEXT PRIMARY KEY,
+    hash TEXT,
+    size INTEGER,
+    mtime REAL
+);
+"""
+
+
+# Diventa True al primo file per cui O_NOATIME non è permesso: da quel
+# momento i file vengono aperti senza, evitando una open() fallita per
+# ogni file quando si copiano file di un altro utente
+_noatime_denied = False
+
+
+def _print_error(message: str):
+    """
+    Stampa un messaggio di errore relativo a un singolo file
+
+    Con le barre di avanzamento attive (tqdm installato e output su
+    terminale) usa tqdm.write, che stampa sopra la barra senza spezzarla.
+
+    Args:
+        message: Messaggio da stampare
+    """
+    if tqdm is not None and sys.stdout.isatty():
+        tqdm.write(message)
+    else:
+        print(message)
+
+
+def _bounded_map(executor: Executor, fn, *iterables, window: int) -> Iterator:
+    """
+    Come executor.map, ma con al massimo window elementi in corso
+
+    executor.map crea subito un future per ogni elemento, che su alberi con
+    milioni di file occupa memoria prima ancora del primo risultato.
+
+    Args:
+        executor: Pool a cui inviare le chiamate
+        fn: Funzione da chiamare
+        iterables: Argomenti di fn, come per map
+        window: Numero massimo di chiamate inviate e non ancora restituite
+
+    Yields:
+        I risultati di fn nello stesso ordine degli argomenti
+    """
+    pending = deque()
+    try:
+        for args in zip(*iterables):
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fn, *args))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Generatore chiuso prima della fine: le chiamate non avviate
+        # non servono più
+        for future in pending:
+            future.cancel()
+
+
+def _fadvise(fd: int, advice_name: str):
+    """
+    Comunica al kernel come verrà letto un file, dove supportato
+
+    Args:
+        fd: Descrittore del file
+        advice_name: Nome della costante di os (es. "POSIX_FADV_SEQUENTIAL")
+    """
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+
+
+@contextmanager
+def _open_for_read(filepath: str, drop_cache: bool = True) -> Iterator[BinaryIO]:
+    """
+    Apre un file in lettura binaria senza buffer intermedio
+
+    Su Linux usa O_NOATIME per non aggiornare la data di accesso, se il
+    processo ha i permessi per farlo (solo il proprietario del file).
+    Dove disponibile posix_fadvise, chiede al kernel una lettura anticipata
+    aggressiva e alla chiusura libera le pagine del file dalla cache: i file
+    di un backup non vengono riletti, e non devono scalzare dalla cache i
+    dati usati dagli altri programmi.
+
+    Args:
+        filepath: Percorso del file
+        drop_cache: Se False le pagine restano in cache, per i file che
+            potrebbero essere letti di nuovo subito dopo
+
+    Yields:
+        Oggetto file aperto con buffering=0
+    """
+    global _noatime_denied
+
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+    noatime = getattr(os, "O_NOATIME", 0)
+
+    fd = None
+    if noatime and not _noatime_denied:
+        try:
+            fd = os.open(filepath, flags | noatime)
+        except PermissionError as e:
+            # EPERM: O_NOATIME vale solo per i file dell'utente corrente;
+            # EACCES è un vero errore di accesso al file
+            if e.errno != errno.EPERM:
+                raise
+            _noatime_denied = True
+    if fd is None:
+        fd = os.open(filepath, flags)
+
+    with os.fdopen(fd, "rb", buffering=0) as f:
+        _fadvise(fd, "POSIX_FADV_SEQUENTIAL")
+        try:
+            yield f
+        finally:
+            if drop_cache:
+                _fadvise(fd, "POSIX_FADV_DONTNEED")
+
+
+def _update_hash_mmap(hasher, f, size: int) -> bool:
+    """
+    Aggiorna un hash con il contenuto di un file mappato in memoria
+
+    Args:
+        hasher: Oggetto hash di hashlib
+        f: File aperto in lettura
+        size: Dimensione del file
+
+    Returns:
+        True se l'hash è stato aggiornato, False se il file non può essere
+        mappato in memoria (es. file speciali) e va letto a blocchi
+    """
+    try:
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            hasher.update(mm)
+        return True
+    except (ValueError, OSError):
+        return False
+
+
+def _update_hash_stream(hasher, f):
+    """
+    Aggiorna un hash leggendo un file a blocchi
+
+    I blocchi vengono letti in un buffer riutilizzato, senza allocare un
+    nuovo oggetto bytes per ogni lettura.
+
+    Args:
+        hasher: Oggetto hash di hashlib
+        f: File aperto in lettura
+    """
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    while True:
+        n = f.readinto(buffer)
+        if not n:
+            break
+        hasher.update(view[:n])
+
+
+def _new_hasher(algo: str):
+    """
+    Crea un oggetto hash vuoto per l'algoritmo indicato
+
+    Args:
+        algo: Algoritmo di hash ("blake3" o un nome accettato da hashlib)
+
+    Returns:
+        Oggetto con i metodi update() e hexdigest()
+    """
+    if algo == "blake3":
+        return blake3.blake3()
+    return hashlib.new(algo)
+
+
+def _copy_and_hash(src: str, dst: str, algo: str = DEFAULT_HASH_ALGO) -> str:
+    """
+    Copia un file calcolandone l'hash sugli stessi dati letti
+
+    Evita di leggere due volte i file da copiare (una per l'hash e una per
+    la copia). Data di modifica e permessi vengono preservati come con
+    shutil.copy2.
+
+    Args:
+        src: Percorso del file sorgente
+        dst: Percorso del file destinazione
+        algo: Algoritmo di hash ("blake3" o un nome accettato da hashlib)
+
+    Returns:
+        Hash del file come stringa esadecimale
+
+    Raises:
+        OSError: Se la lettura o la scrittura falliscono
+    """
+    hasher = _new_hasher(algo)
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    with _open_for_read(src) as fsrc, open(dst, "wb") as fdst:
+        while True:
+            n = fsrc.readinto(buffer)
+            if not n:
+                break
+            chunk = view[:n]
+            hasher.update(chunk)
+            fdst.write(chunk)
+
+    shutil.copystat(src, dst)
+    return hasher.hexdigest()
+
+
+def _fast_copy(src_fd: int, dst_fd: int, size: int):
+    """
+    Copia il contenuto di un file nel kernel, senza passare da buffer Python
+
+    Prova nell'ordine os.copy_file_range (che sui filesystem con reflink,
+    come btrfs e XFS, condivide i blocchi senza copiarli), os.sendfile e
+    infine una copia a blocchi con shutil.copyfileobj.
+
+    Args:
+        src_fd: Descrittore del file sorgente, aperto in lettura
+        dst_fd: Descrittore del file destinazione, aperto in scrittura
+        size: Numero di byte da copiare
+    """
+    offset = 0
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                n = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+                if n == 0:
+                    break
+                offset += n
+            # Se nessun byte è stato copiato (alcuni filesystem virtuali
+            # restituiscono 0 subito) si passa al metodo successivo; altrimenti
+            # 0 indica che il file sorgente è stato accorciato nel frattempo
+            if offset > 0 or size == 0:
+                return
+        except OSError as e:
+            if e.errno not in _FAST_COPY_FALLBACK_ERRNOS:
+                raise
+
+    if hasattr(os, "sendfile"):
+        try:
+            # sendfile scrive alla posizione corrente della destinazione
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset < size:
+                n = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                if n == 0:
+                    break
+                offset += n
+            if offset > 0:
+                return
+        except OSError as e:
+            if e.errno not in _FAST_COPY_FALLBACK_ERRNOS:
+                raise
+
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    with os.fdopen(src_fd, "rb", closefd=False) as fsrc, \
+            os.fdopen(dst_fd, "wb", closefd=False) as fdst:
+        shutil.copyfileobj(fsrc, fdst, READ_BUFFER_SIZE)
+
+
+def _copy_file(src: str, dst: str):
+    """
+    Copia un file con _fast_copy preservando data di modifica e permessi
+
+    Args:
+        src: Percorso del file sorgente
+        dst: Percorso del file destinazione
+
+    Raises:
+        OSError: Se la lettura o la scrittura falliscono
+    """
+    with _open_for_read(src) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        _fast_copy(fsrc.fileno(), fdst.fileno(), size)
+
+    shutil.copystat(src, dst)
+
+
+def _store_chunks(src: str, chunks_dir: str, manifest_file: str,
+                  algo: str = DEFAULT_HASH_ALGO) -> str:
+    """
+    Salva un file come sequenza di blocchi deduplicati
+
+    Il file viene diviso con FastCDC in blocchi delimitati dal contenuto,
+    quindi un'aggiunta o una rimozione di byte cambia solo i blocchi vicini.
+    Ogni blocco viene scritto in chunks_dir/<aa>/<hash> (hash calcolato con
+    CHUNK_HASH_ALGO) solo se non esiste già; il manifest elenca in ordine
+    gli hash dei blocchi che, concatenati, ricostruiscono il file.
+
+    Args:
+        src: Percorso del file sorgente
+        chunks_dir: Cartella dei blocchi
+        manifest_file: Percorso del manifest JSON da scrivere
+        algo: Algoritmo dell'hash dell'intero file ("blake3" o un nome
+            accettato da hashlib)
+
+    Returns:
+        Hash dell'intero file come stringa esadecimale
+
+    Raises:
+        OSError: Se la lettura o la scrittura falliscono
+    """
+    file_hasher = _new_hasher(algo)
+    chunk_hashes = []
+    stat = os.stat(src)
+    size = stat.st_size
+
+    # FastCDC mappa il file in memoria, cosa non possibile per file vuoti
+    chunks = fastcdc.fastcdc(src, CDC_MIN_SIZE, CDC_AVG_SIZE, CDC_MAX_SIZE, fat=True) if size else []
+    for chunk in chunks:
+        file_hasher.update(chunk.data)
+        chunk_hasher = _new_hasher(CHUNK_HASH_ALGO)
+        chunk_hasher.update(chunk.data)
+        chunk_hash = chunk_hasher.hexdigest()
+        chunk_hashes.append(chunk_hash)
+
+        chunk_file = os.path.join(chunks_dir, chunk_hash[:2], chunk_hash)
+        if not os.path.exists(chunk_file):
+            os.makedirs(os.path.dirname(chunk_file), exist_ok=True)
+            # Scrittura su file temporaneo e rinomina: un blocco interrotto
+            # a metà non viene mai scambiato per uno già salvato. Il nome
+            # temporaneo è distinto per thread, perché lo stesso blocco può
+            # essere salvato da due copie contemporanee
+            tmp_file = f"{chunk_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(chunk.data)
+            os.replace(tmp_file, chunk_file)
+
+    file_hash = file_hasher.hexdigest()
+    manifest = {
+        "size": size,
+        "mtime": stat.st_mtime,
+        "hash": file_hash,
+        "hash_algo": algo,
+        "chunk_hash_algo": CHUNK_HASH_ALGO,
+        "chunks": chunk_hashes,
+    }
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return file_hash
+
+
+def _restore_chunks(manifest_file: str, chunks_dir: str, dst: str):
+    """
+    Ricostruisce un file salvato con _store_chunks
+
+    I blocchi elencati nel manifest vengono concatenati in un file
+    temporaneo, rinominato solo se dimensione e hash dell'intero file
+    coincidono con quelli del manifest.
+
+    Args:
+        manifest_file: Percorso del manifest JSON
+        chunks_dir: Cartella dei blocchi
+        dst: Percorso del file da ricostruire
+
+    Raises:
+        OSError: Se la lettura o la scrittura falliscono
+        ValueError: Se il manifest non è valido o il file ricostruito non
+            corrisponde al manifest
+    """
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    try:
+        chunk_hashes = manifest["chunks"]
+        expected = (manifest["size"], manifest["hash"])
+    except (KeyError, TypeError):
+        raise ValueError("manifest non valido")
+
+    algo = manifest.get("hash_algo", "md5")
+    if algo == "blake3" and blake3 is None:
+        raise ValueError("il manifest usa l'hash blake3, che richiede il modulo blake3")
+    file_hasher = _new_hasher(algo)
+    size = 0
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_file = f"{dst}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, "wb") as fdst:
+            for chunk_hash in chunk_hashes:
+                chunk_file = os.path.join(chunks_dir, chunk_hash[:2], chunk_hash)
+                with open(chunk_file, "rb") as fchunk:
+                    data = fchunk.read()
+                file_hasher.update(data)
+                fdst.write(data)
+                size += len(data)
+
+        if (size, file_hasher.hexdigest()) != expected:
+            raise ValueError("il file ricostruito non corrisponde al manifest")
+        if "mtime" in manifest:
+            os.utime(tmp_file, (manifest["mtime"], manifest["mtime"]))
+        os.replace(tmp_file, dst)
+    except (OSError, ValueError):
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def _fastest_hashlib_algo() -> str:
+    """
+    Misura la velocità degli algoritmi di HASHLIB_ALGOS su questa CPU
+
+    Returns:
+        Nome dell'algoritmo più veloce (a parità, il primo dell'elenco)
+    """
+    data = b"x" * (1 << 20)
+    timings = {}
+    for algo in HASHLIB_ALGOS:
+        start = time.perf_counter()
+        for _ in range(8):
+            hashlib.new(algo, data)
+        timings[algo] = time.perf_counter() - start
+    return min(HASHLIB_ALGOS, key=timings.get)
+
+
+def _select_hash_algo(previous_algo: Optional[str] = None) -> str:
+    """
+    Sceglie l'algoritmo di hash per un backup
+
+    BLAKE3 se il modulo è installato. Altrimenti si mantiene l'algoritmo
+    dell'ultimo backup, così che gli hash salvati restino confrontabili, e
+    solo in sua assenza si sceglie il più veloce tra quelli di hashlib.
+
+    Args:
+        previous_algo: Algoritmo usato dall'ultimo backup, None se non ce
+            n'è uno da cui proseguire (primo backup o backup completo)
+
+    Returns:
+        Nome dell'algoritmo
+    """
+    if blake3 is not None:
+        return "blake3"
+    if previous_algo in HASHLIB_ALGOS:
+        return previous_algo
+    return _fastest_hashlib_algo()
+
+
+def _calculate_file_hash(filepath: str, algo: str = DEFAULT_HASH_ALGO,
+                         size_hint: Optional[int] = None) -> str:
+    """
+    Calcola l'hash di un file
+
+    Definita a livello di modulo per poterla passare a un executor.
+    Le pagine lette restano in cache: se l'hash risulta cambiato il file
+    viene copiato subito dopo, e la copia non deve rileggerlo dal disco.
+
+    Args:
+        filepath: Percorso del file
+        algo: Algoritmo di hash ("blake3" o un nome accettato da hashlib)
+        size_hint: Dimensione già nota dalla scansione; se sotto la soglia
+            per mmap il file viene letto a blocchi senza un'altra fstat()
+
+    Returns:
+        Hash del file come stringa esadecimale
+    """
+    try:
+        if algo == "blake3":
+            # update_mmap legge il file tramite memory map e usa più thread
+            hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            hasher.update_mmap(filepath)
+            return hasher.hexdigest()
+
+        hasher = hashlib.new(algo)
+        with _open_for_read(filepath, drop_cache=False) as f:
+            if size_hint is not None and size_hint < MMAP_THRESHOLD:
+                _update_hash_stream(hasher, f)
+            else:
+                # Per mmap serve la dimensione attuale, non quella della scansione
+                size = os.fstat(f.fileno()).st_size
+                if size < MMAP_THRESHOLD or not _update_hash_mmap(hasher, f, size):
+                    _update_hash_stream(hasher, f)
+        return hasher.hexdigest()
+    except (IOError, OSError) as e:
+        _print_error(f"Errore durante il calcolo hash di {filepath}: {e}")
+        return ""
 
 
 class IncrementalBackup:
     """Gestisce il backup incrementale di una directory"""
 
-    def __init__(self):
-        """Inizializza il sistema di backup"""
+    def __init__(self, delta_strategy: str = DELTA_TRUST_INCREMENTAL,
+                 workers: int = DEFAULT_WORKERS, cdc: bool = False,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Inizializza il sistema di backup
+
+        Args:
+            delta_strategy: DELTA_ALWAYS per ricalcolare sempre l'hash,
+                DELTA_TRUST_INCREMENTAL per riusare quello dell'ultimo backup
+                quando dimensione e data di modifica coincidono
+            workers: Numero di thread usati per calcolare gli hash
+            cdc: Se True, salva i file come blocchi deduplicati con manifest
+                invece di copiarli (richiede il modulo fastcdc)
+            concurrency: Numero di file copiati contemporaneamente
+        """
+        if delta_strategy not in (DELTA_ALWAYS, DELTA_TRUST_INCREMENTAL):
+            raise ValueError(f"Strategia di confronto non valida: {delta_strategy}")
+        if workers < 1:
+            raise ValueError(f"Numero di thread non valido: {workers}")
+        if concurrency < 1:
+            raise ValueError(f"Numero di copie contemporanee non valido: {concurrency}")
+        if cdc and fastcdc is None:
+            raise ValueError("il backup a blocchi richiede il modulo fastcdc (pip install fastcdc)")
+
         self.metadata_file = None
         self.metadata = {}
+        self.delta_strategy = delta_strategy
+        self.workers = workers
+        self.cdc = cdc
+        self.concurrency = concurrency
+        self.hash_algo = DEFAULT_HASH_ALGO
+        # Barre di avanzamento solo su terminale: con l'output rediretto
+        # non si scrive nulla per i singoli file
+        self._verbose = sys.stdout.isatty()
 
     def _generate_metadata_filename(self, source_path: Path) -> Path:
         """
-        Genera un nome file JSON unico basato sul percorso sorgente
+        Genera un nome file unico per il database dei metadati basato sul
+        percorso sorgente
 
         Args:
             source_path: Percorso assoluto della cartella sorgente
 
         Returns:
-            Path del file JSON nella home directory
+            Path del database SQLite nella home directory
 
         Examples:
-            c:\\tmp\\pippo -> copia_incrementale_c^tmp^pippo.json
-            /home/user/docs -> copia_incrementale_home^user^docs.json
+            c:\\tmp\\pippo -> copia_incrementale_c^tmp^pippo.db
+            /home/user/docs -> copia_incrementale_home^user^docs.db
         """
         # Converti in percorso assoluto e stringa
         abs_path = str(source_path.resolve())
@@ -48,96 +668,396 @@ class IncrementalBackup:
         sanitized = sanitized.lstrip("^")
 
         # Crea il nome file
-        filename = f"copia_incrementale_{sanitized}.json"
+        filename = f"copia_incrementale_{sanitized}.db"
 
         # Salva nella home directory
         return Path.home() / filename
 
-    def _calculate_file_hash(self, filepath: Path) -> str:
+    def _progress(self, iterable, desc: str, total: Optional[int] = None):
         """
-        Calcola l'hash MD5 di un file
+        Avvolge un iterabile in una barra di avanzamento, se disponibile
+
+        La barra viene mostrata solo se tqdm è installato e l'output è un
+        terminale; altrimenti l'iterabile viene restituito invariato.
 
         Args:
-            filepath: Percorso del file
+            iterable: Elementi da elaborare
+            desc: Descrizione mostrata accanto alla barra
+            total: Numero totale di elementi, se noto
 
         Returns:
-            Hash MD5 del file come stringa esadecimale
+            Iterabile con gli stessi elementi
         """
-        hash_md5 = hashlib.md5()
-        try:
-            with open(filepath, "rb") as f:
-                # Leggi il file a blocchi per gestire file grandi
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except (IOError, OSError) as e:
-            print(f"Errore durante il calcolo hash di {filepath}: {e}")
-            return ""
+        if tqdm is None or not self._verbose:
+            return iterable
+        return tqdm(iterable, desc=desc, total=total, unit=" file", leave=False)
+
+    def _iter_files(self, root: str) -> Iterator[os.DirEntry]:
+        """
+        Percorre ricorsivamente una directory con os.scandir
+
+        Il tipo delle voci viene letto da readdir dove il sistema lo fornisce,
+        quindi non serve una stat() per distinguere file e directory.
+        I link simbolici a directory non vengono seguiti, come in os.walk.
 
-    def _scan_directory(self, source_path: Path) -> Dict[str, dict]:
+        Args:
+            root: Percorso della directory da percorrere
+
+        Yields:
+            Una DirEntry per ogni file trovato
+        """
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            yield from self._iter_files(entry.path)
+                        elif entry.is_file():
+                            yield entry
+                    except OSError as e:
+                        _print_error(f"Errore durante la scansione di {entry.path}: {e}")
+        except OSError as e:
+            _print_error(f"Errore durante la lettura della cartella {root}: {e}")
+
+    def _scan_directory(self, source_path: Path, stat_only: bool = False) -> Dict[str, dict]:
         """
         Scansiona una directory e raccoglie informazioni su tutti i file
 
         Args:
             source_path: Percorso della directory da scansionare
+            stat_only: Se True nessun file viene letto e nessun hash viene
+                riusato dall'ultimo backup: l'hash resta None per tutti i
+                file. Da usare quando tutti i file verranno comunque copiati
+                (backup completo o primo backup), così l'hash viene
+                calcolato una sola volta, durante la copia.
 
         Returns:
-            Dizionario con path relativo come chiave e metadati come valore
+            Dizionario con path relativo (separato da "/") come chiave e
+            metadati come valore.
+            L'hash è None per i file sicuramente da copiare (nuovi o con
+            dimensione diversa): viene calcolato durante la copia.
         """
         files_info = {}
 
+        # Metadati dell'ultimo backup, usati per evitare di ricalcolare
+        # l'hash dei file non modificati (solo se calcolato con lo stesso
+        # algoritmo; i metadati senza "hash_algo" sono stati creati con MD5).
+        # Con stat_only non si riusano: un backup completo ricopia e
+        # ricalcola tutto, anche i file modificati con data preservata
+        if stat_only:
+            previous_files = {}
+        elif self.metadata.get("hash_algo", "md5") == self.hash_algo:
+            previous_files = self.metadata.get("files", {})
+        else:
+            previous_files = {}
+        trust_mtime = self.delta_strategy == DELTA_TRUST_INCREMENTAL
+
         if not source_path.exists():
             print(f"Errore: la cartella {source_path} non esiste")
             return files_info
 
         print(f"\nScansione della cartella: {source_path}")
 
-        for root, dirs, files in os.walk(source_path):
-            for filename in files:
-                filepath = Path(root) / filename
-                relative_path = filepath.relative_to(source_path)
-
-                try:
-                    stat = filepath.stat()
-                    file_hash = self._calculate_file_hash(filepath)
-
-                    files_info[str(relative_path)] = {
-                        "hash": file_hash,
-                        "size": stat.st_size,
-                        "mtime": stat.st_mtime,
-                        "mtime_readable": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    }
+        root = str(source_path)
+        # Il path relativo si ottiene tagliando il prefisso della radice,
+        # senza oggetti Path né os.path.relpath per ogni file
+        prefix_len = len(os.path.join(root, ""))
+        # File il cui hash va calcolato: (path relativo, path completo, dimensione)
+        to_hash = []
 
-                    print(f"  Scansionato: {relative_path}")
+        for entry in self._progress(self._iter_files(root), "Scansione"):
+            # Separatore "/" su tutti i sistemi operativi
+            relative_path = entry.path[prefix_len:]
+            if os.sep != "/":
+                relative_path = relative_path.replace(os.sep, "/")
 
-                except (IOError, OSError) as e:
-                    print(f"Errore durante la scansione di {filepath}: {e}")
+            try:
+                # Unica chiamata di sistema per i file invariati: il tipo
+                # arriva da readdir e il file non viene aperto
+                stat = entry.stat()
+
+                prev = previous_files.get(relative_path)
+                file_hash = None
+                if prev and prev["size"] == stat.st_size:
+                    if trust_mtime and prev["mtime"] == stat.st_mtime:
+                        file_hash = prev["hash"]
+                    elif not stat_only:
+                        # Stessa dimensione ma data diversa: serve l'hash
+                        # per sapere se il contenuto è cambiato davvero
+                        to_hash.append((relative_path, entry.path, stat.st_size))
+
+                files_info[relative_path] = {
+                    "hash": file_hash,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime
+                }
+
+            except (IOError, OSError) as e:
+                _print_error(f"Errore durante la scansione di {entry.path}: {e}")
+
+        hashed = self._progress(self._hash_files(to_hash), "Calcolo hash", len(to_hash))
+        for relative_path, file_hash in hashed:
+            files_info[relative_path]["hash"] = file_hash
+
+        print(f"  {len(files_info)} file trovati, {len(to_hash)} hash calcolati")
 
         return files_info
 
-    def _load_metadata(self) -> Dict:
+    def _hash_files(self, files: List[Tuple[str, str, int]]) -> Iterator[Tuple[str, str]]:
+        """
+        Calcola l'hash di una lista di file, in parallelo se sono abbastanza
+
+        Args:
+            files: Lista di tuple (path relativo, path completo, dimensione)
+
+        Yields:
+            Tuple (path relativo, hash) nello stesso ordine di ingresso
+        """
+        relative_paths = [relative_path for relative_path, _, _ in files]
+        paths = [path for _, path, _ in files]
+        sizes = [size for _, _, size in files]
+        algo = self.hash_algo
+
+        def calculate_hash(path: str, size: int) -> str:
+            return _calculate_file_hash(path, algo, size)
+
+        if self.workers == 1 or len(files) < PARALLEL_THRESHOLD:
+            yield from zip(relative_paths, map(calculate_hash, paths, sizes))
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            hashes = _bounded_map(executor, calculate_hash, paths, sizes,
+                                  window=PENDING_PER_WORKER * self.workers)
+            yield from zip(relative_paths, hashes)
+
+    def _connect_metadata(self) -> sqlite3.Connection:
+        """
+        Apre il database dei metadati, creando le tabelle se mancano
+
+        Returns:
+            Connessione al database
+        """
+        conn = sqlite3.connect(str(self.metadata_file))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(METADATA_SCHEMA)
+        return conn
+
+    def _backup_file(self, relative_path: str, file_info: dict,
+                     source_root: str, dest_root: str) -> str:
+        """
+        Copia un singolo file nella destinazione
+
+        Args:
+            relative_path: Path relativo del file
+            file_info: Metadati del file sorgente (hash None se ancora da
+                calcolare)
+            source_root: Cartella origine
+            dest_root: Cartella destinazione
+
+        Returns:
+            Hash del file
+
+        Raises:
+            OSError: Se la lettura o la scrittura falliscono
+        """
+        src_file = os.path.join(source_root, relative_path)
+        dst_file = os.path.join(dest_root, relative_path)
+
+        if self.cdc:
+            chunks_dir = os.path.join(dest_root, ".chunks")
+            manifest_file = os.path.join(dest_root, "manifests", relative_path + ".json")
+            return _store_chunks(src_file, chunks_dir, manifest_file, self.hash_algo)
+
+        # Crea le directory necessarie
+        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+
+        if file_info["hash"] is None:
+            # Hash non ancora calcolato: lo si calcola sugli stessi dati
+            # letti per la copia
+            return _copy_and_hash(src_file, dst_file, self.hash_algo)
+
+        _copy_file(src_file, dst_file)
+        return file_info["hash"]
+
+    def _copy_files(self, files: List[str], current_files: Dict[str, dict],
+                    source_root: str, dest_root: str
+                    ) -> Iterator[Tuple[str, Optional[str], Optional[OSError]]]:
         """
-        Carica i metadati dal file JSON
+        Copia una lista di file, con più copie in corso contemporaneamente
+
+        Tenere più letture in corso nasconde la latenza di dischi di rete
+        (NFS, CephFS, ...); in locale bastano pochi thread.
+
+        Args:
+            files: Path relativi dei file da copiare
+            current_files: Metadati dei file sorgente
+            source_root: Cartella origine
+            dest_root: Cartella destinazione
+
+        Yields:
+            Tuple (path relativo, hash, errore) nello stesso ordine di
+            ingresso; in caso di errore hash è None
+        """
+        def backup_file(relative_path: str):
+            try:
+                file_hash = self._backup_file(
+                    relative_path, current_files[relative_path], source_root, dest_root)
+                return relative_path, file_hash, None
+            except (IOError, OSError) as e:
+                return relative_path, None, e
+
+        if self.concurrency == 1:
+            yield from map(backup_file, files)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            yield from _bounded_map(executor, backup_file, files,
+                                    window=PENDING_PER_WORKER * self.concurrency)
+
+    def _sync_mtimes(self, files: Iterable[str], current_files: Dict[str, dict],
+                     dest_root: str) -> int:
+        """
+        Aggiorna la data di modifica dei file solo "toccati" nella destinazione
+
+        I file con contenuto invariato ma data di modifica diversa non vengono
+        copiati: se la destinazione contiene il file con la stessa dimensione
+        gli viene assegnata la nuova data, senza leggerlo.
+
+        Args:
+            files: Path relativi dei file con solo la data cambiata
+            current_files: Metadati dei file sorgente
+            dest_root: Cartella destinazione
 
         Returns:
-            Dizionario con i metadati o dizionario vuoto se il file non esiste
+            Numero di file aggiornati nella destinazione
         """
-        if self.metadata_file.exists():
+        synced_count = 0
+        for relative_path in files:
+            dst_file = os.path.join(dest_root, relative_path)
+            file_info = current_files[relative_path]
             try:
-                with open(self.metadata_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                print(f"Errore durante il caricamento dei metadati: {e}")
+                dst_stat = os.stat(dst_file)
+                if dst_stat.st_size != file_info["size"]:
+                    continue
+                os.utime(dst_file, (dst_stat.st_atime, file_info["mtime"]))
+                synced_count += 1
+            except OSError:
+                # Destinazione diversa da quella del backup precedente o
+                # file rimosso: non c'è nulla da aggiornare
+                continue
+        return synced_count
+
+    def _load_json_metadata(self, json_file: Path) -> Dict:
+        """
+        Carica i metadati dal file JSON usato dalle versioni precedenti
+
+        Args:
+            json_file: Percorso del file JSON
+
+        Returns:
+            Dizionario con i metadati o dizionario vuoto in caso di errore
+        """
+        try:
+            if orjson is not None:
+                with open(json_file, "rb") as f:
+                    return orjson.loads(f.read())
+            with open(json_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        # orjson.JSONDecodeError è una sottoclasse di json.JSONDecodeError
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Errore durante il caricamento dei metadati: {e}")
+            return {}
+
+    def _load_metadata(self) -> Dict:
+        """
+        Carica i metadati dal database SQLite
+
+        Se il database non esiste ma c'è il file JSON di una versione
+        precedente, i metadati vengono importati da quest'ultimo.
+
+        Returns:
+            Dizionario con i metadati o dizionario vuoto se non ci sono
+        """
+        if not self.metadata_file.exists():
+            json_file = self.metadata_file.with_suffix(".json")
+            if not json_file.exists():
                 return {}
-        return {}
 
-    def _save_metadata(self):
-        """Salva i metadati nel file JSON"""
+            metadata = self._load_json_metadata(json_file)
+            if metadata:
+                try:
+                    with closing(self._connect_metadata()) as conn:
+                        self._write_metadata(conn, metadata)
+                    print(f"Metadati importati da: {json_file}")
+                except sqlite3.Error as e:
+                    print(f"Errore durante l'importazione dei metadati: {e}")
+            return metadata
+
+        try:
+            with closing(self._connect_metadata()) as conn:
+                metadata = dict(conn.execute("SELECT key, value FROM info"))
+                # Senza informazioni nessun backup è stato completato
+                if metadata:
+                    metadata["files"] = {
+                        rel: {"hash": file_hash, "size": size, "mtime": mtime}
+                        for rel, file_hash, size, mtime
+                        in conn.execute("SELECT rel, hash, size, mtime FROM files")
+                    }
+                return metadata
+        except sqlite3.Error as e:
+            print(f"Errore durante il caricamento dei metadati: {e}")
+            return {}
+
+    def _write_metadata(self, conn: sqlite3.Connection, metadata: Dict,
+                        changed_files: Optional[Iterable[str]] = None,
+                        deleted_files: Iterable[str] = ()):
+        """
+        Scrive i metadati nel database in un'unica transazione
+
+        Args:
+            conn: Connessione al database
+            metadata: Metadati da scrivere
+            changed_files: File nuovi o cambiati da scrivere; None per
+                riscrivere l'intera tabella dei file
+            deleted_files: File da rimuovere dalla tabella
+        """
+        files = metadata.get("files", {})
+
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                [(key, value) for key, value in metadata.items() if key != "files"]
+            )
+
+            if changed_files is None:
+                conn.execute("DELETE FROM files")
+                changed_files = files.keys()
+            else:
+                conn.executemany("DELETE FROM files WHERE rel = ?",
+                                 ((rel,) for rel in deleted_files))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (rel, hash, size, mtime) VALUES (?, ?, ?, ?)",
+                ((rel, files[rel]["hash"], files[rel]["size"], files[rel]["mtime"])
+                 for rel in changed_files)
+            )
+
+    def _save_metadata(self, changed_files: Optional[Iterable[str]] = None,
+                       deleted_files: Iterable[str] = ()):
+        """
+        Salva i metadati nel database SQLite
+
+        Args:
+            changed_files: File nuovi o cambiati da scrivere; None per
+                riscrivere l'intera tabella dei file
+            deleted_files: File da rimuovere dalla tabella
+        """
         try:
-            with open(self.metadata_file, "w", encoding="utf-8") as f:
-                json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+            with closing(self._connect_metadata()) as conn:
+                self._write_metadata(conn, self.metadata, changed_files, deleted_files)
             print(f"\nMetadati salvati in: {self.metadata_file}")
-        except IOError as e:
+        except sqlite3.Error as e:
             print(f"Errore durante il salvataggio dei metadati: {e}")
 
     def _compare_files(self, current_files: Dict[str, dict]) -> Tuple[Set[str], Set[str], Set[str]]:
@@ -152,17 +1072,17 @@ class IncrementalBackup:
         """
         previous_files = self.metadata.get("files", {})
 
-        current_set = set(current_files.keys())
-        previous_set = set(previous_files.keys())
+        # Differenze calcolate direttamente sulle viste delle chiavi dei
+        # dizionari, senza costruire prima due set completi
+        new_files = current_files.keys() - previous_files.keys()
+        deleted_files = previous_files.keys() - current_files.keys()
 
-        new_files = current_set - previous_set
-        deleted_files = previous_set - current_set
-        potentially_modified = current_set & previous_set
-
-        modified_files = set()
-        for filepath in potentially_modified:
-            if current_files[filepath]["hash"] != previous_files[filepath]["hash"]:
-                modified_files.add(filepath)
+        # Hash None: dimensione cambiata, il file è sicuramente modificato
+        modified_files = {
+            filepath for filepath, info in current_files.items()
+            if filepath in previous_files
+            and (info["hash"] is None or info["hash"] != previous_files[filepath]["hash"])
+        }
 
         return new_files, modified_files, deleted_files
 
@@ -178,21 +1098,34 @@ class IncrementalBackup:
         source_path = Path(source).resolve()
         dest_path = Path(destination).resolve()
 
-        # Genera il nome del file JSON specifico per questa sorgente
+        # Genera il nome del database specifico per questa sorgente
         self.metadata_file = self._generate_metadata_filename(source_path)
 
         # Carica i metadati specifici per questa sorgente
         self.metadata = self._load_metadata()
 
+        # L'algoritmo si sceglie liberamente solo quando gli hash dell'ultimo
+        # backup non servono (primo backup o backup completo)
+        previous_algo = self.metadata.get("hash_algo", "md5")
+        if incremental and "files" in self.metadata:
+            self.hash_algo = _select_hash_algo(previous_algo)
+        else:
+            self.hash_algo = _select_hash_algo()
+
         print("=" * 70)
         print("BACKUP INCREMENTALE")
         print("=" * 70)
         print(f"Origine:      {source_path}")
         print(f"Destinazione: {dest_path}")
-        print(f"File JSON:    {self.metadata_file}")
+        print(f"Metadati:     {self.metadata_file}")
         print(f"Modalità:     {'Incrementale' if incremental else 'Completo'}")
+        print(f"Hash:         {self.hash_algo}")
         print("=" * 70)
 
+        if incremental and "files" in self.metadata and previous_algo != self.hash_algo:
+            print(f"\nAttenzione: l'ultimo backup usava l'hash {previous_algo}, "
+                  "tutti i file verranno considerati modificati.")
+
         if not source_path.exists():
             print(f"\nErrore: la cartella origine '{source_path}' non esiste!")
             return
@@ -200,18 +1133,34 @@ class IncrementalBackup:
         # Crea la cartella di destinazione se non esiste
         dest_path.mkdir(parents=True, exist_ok=True)
 
-        # Scansiona i file nella cartella origine
-        current_files = self._scan_directory(source_path)
+        # Scansiona i file nella cartella origine; se verranno copiati tutti,
+        # gli hash mancanti si calcolano durante la copia
+        full_copy = not (incremental and "files" in self.metadata)
+        current_files = self._scan_directory(source_path, stat_only=full_copy)
 
         if not current_files:
             print("\nNessun file trovato nella cartella origine.")
             return
 
+        # File da aggiornare nel database (None: riscrittura completa)
+        changed_files = None
+        deleted_files = set()
+        touched_files = set()
+
         # Determina quali file copiare
-        if incremental and "files" in self.metadata:
+        if not full_copy:
             new_files, modified_files, deleted_files = self._compare_files(current_files)
             files_to_copy = new_files | modified_files
 
+            # Anche i file con contenuto invariato ma data di modifica
+            # diversa vanno aggiornati nel database
+            previous_files = self.metadata["files"]
+            touched_files = {
+                f for f in (current_files.keys() & previous_files.keys()) - modified_files
+                if current_files[f]["mtime"] != previous_files[f]["mtime"]
+            }
+            changed_files = files_to_copy | touched_files
+
             print(f"\n{'=' * 70}")
             print("ANALISI INCREMENTALE")
             print(f"{'=' * 70}")
@@ -241,6 +1190,12 @@ class IncrementalBackup:
             files_to_copy = set(current_files.keys())
             print(f"\nBackup completo: {len(files_to_copy)} file da copiare")
 
+        # L'inventario dell'ultimo backup non serve più: liberarlo prima
+        # della copia riduce il picco di memoria sui grandi alberi
+        previous_files = None
+        self.metadata.pop("files", None)
+        gc.collect()
+
         # Copia i file
         if files_to_copy:
             print(f"\n{'=' * 70}")
@@ -248,57 +1203,160 @@ class IncrementalBackup:
             print(f"{'=' * 70}")
 
             copied_count = 0
-            for relative_path in sorted(files_to_copy):
-                src_file = source_path / relative_path
-                dst_file = dest_path / relative_path
+            results = self._copy_files(sorted(files_to_copy), current_files,
+                                       str(source_path), str(dest_path))
+            for relative_path, file_hash, error in self._progress(
+                    results, "Copia", len(files_to_copy)):
+                if error is not None:
+                    _print_error(f"  Errore durante la copia di {relative_path}: {error}")
+                    continue
 
-                # Crea le directory necessarie
-                dst_file.parent.mkdir(parents=True, exist_ok=True)
-
-                try:
-                    shutil.copy2(src_file, dst_file)
-                    print(f"  Copiato: {relative_path}")
-                    copied_count += 1
-                except (IOError, OSError) as e:
-                    print(f"  Errore durante la copia di {relative_path}: {e}")
+                current_files[relative_path]["hash"] = file_hash
+                copied_count += 1
 
             print(f"\n{copied_count} file copiati con successo!")
         else:
             print("\nNessun file da copiare (nessuna modifica rilevata).")
 
+        # I file con contenuto invariato mantengono nella destinazione la
+        # stessa data di modifica dell'origine; nel formato a blocchi la
+        # data è nel manifest dell'ultima copia, che non viene riscritto
+        if touched_files and not self.cdc:
+            synced_count = self._sync_mtimes(sorted(touched_files), current_files, str(dest_path))
+            if synced_count:
+                print(f"{synced_count} file con contenuto invariato: aggiornata solo la data")
+
         # Aggiorna e salva i metadati
         self.metadata = {
             "last_backup": datetime.now().isoformat(),
             "source": str(source_path),
             "destination": str(dest_path),
             "files": current_files,
+            "hash_algo": self.hash_algo,
             "backup_type": "incremental" if incremental else "full"
         }
-        self._save_metadata()
+        self._save_metadata(changed_files, deleted_files)
 
         print(f"\n{'=' * 70}")
         print("BACKUP COMPLETATO")
         print(f"{'=' * 70}\n")
 
+    def restore(self, source: str, destination: str):
+        """
+        Ricostruisce i file di un backup a blocchi (--cdc)
+
+        Ogni manifest in source/manifests diventa un file in destination,
+        ricostruito dai blocchi di source/.chunks. Un backup incrementale
+        contiene solo i file nuovi o modificati: per la copia completa si
+        ripristinano in ordine, nella stessa destinazione, tutti i backup
+        dal primo completo in poi.
+
+        Args:
+            source: Cartella destinazione di un backup eseguito con --cdc
+            destination: Cartella in cui ricostruire i file
+        """
+        source_path = Path(source).resolve()
+        dest_path = Path(destination).resolve()
+        manifests_root = source_path / "manifests"
+        chunks_dir = str(source_path / ".chunks")
+
+        print("=" * 70)
+        print("RIPRISTINO BACKUP A BLOCCHI")
+        print("=" * 70)
+        print(f"Backup:       {source_path}")
+        print(f"Destinazione: {dest_path}")
+        print("=" * 70)
+
+        if not manifests_root.is_dir():
+            print(f"\nErrore: '{source_path}' non contiene un backup a blocchi!")
+            return
+
+        root = str(manifests_root)
+        prefix_len = len(os.path.join(root, ""))
+        restored_count = 0
+
+        for entry in self._progress(self._iter_files(root), "Ripristino"):
+            if not entry.name.endswith(".json"):
+                continue
+            relative_path = entry.path[prefix_len:-len(".json")]
+            try:
+                _restore_chunks(entry.path, chunks_dir,
+                                os.path.join(str(dest_path), relative_path))
+                restored_count += 1
+            except (OSError, ValueError) as e:
+                _print_error(f"  Errore durante il ripristino di {relative_path}: {e}")
+
+        print(f"\n{restored_count} file ripristinati con successo!")
+
+
+def _parse_int_option(argv: List[str], name: str, default: int) -> int:
+    """
+    Legge dalla riga di comando un'opzione con valore intero positivo
+
+    Args:
+        argv: Argomenti della riga di comando
+        name: Nome dell'opzione (es. "--parallel")
+        default: Valore da usare se l'opzione non è presente
+
+    Returns:
+        Valore dell'opzione
+    """
+    if name not in argv:
+        return default
+
+    try:
+        value = int(argv[argv.index(name) + 1])
+    except (IndexError, ValueError):
+        value = 0
+
+    if value < 1:
+        print(f"Errore: {name} richiede un numero intero positivo")
+        sys.exit(1)
+
+    return value
+
 
 def main():
     """Funzione principale del programma"""
 
     if len(sys.argv) < 3:
-        print("Uso: python incremental_backup.py <cartella_origine> <cartella_destinazione> [--full]")
+        print("Uso: python incremental_backup.py <cartella_origine> <cartella_destinazione> [--full] [--always-hash] [--parallel N] [--cdc] [--concurrency N]")
+        print("     python incremental_backup.py <backup_cdc> <cartella_destinazione> --restore")
         print("\nOpzioni:")
-        print("  --full    Esegue un backup completo invece di uno incrementale")
+        print("  --full             Esegue un backup completo invece di uno incrementale")
+        print("  --always-hash      Ricalcola l'hash di tutti i file, anche se dimensione")
+        print("                     e data di modifica non sono cambiate")
+        print(f"  --parallel N       Usa N thread per il calcolo degli hash (predefinito: {DEFAULT_WORKERS})")
+        print("  --cdc              Salva i file come blocchi deduplicati (richiede fastcdc)")
+        print(f"  --concurrency N    Copia N file contemporaneamente (predefinito: {DEFAULT_CONCURRENCY});")
+        print("                     valori più alti per sorgenti su dischi di rete")
+        print("  --restore          Ricostruisce nella destinazione i file di un backup --cdc")
         print("\nEsempi:")
         print("  python incremental_backup.py ./folder_A ./folder_B")
         print("  python incremental_backup.py ./folder_A ./folder_C")
         print("  python incremental_backup.py ./folder_A ./folder_D --full")
+        print("  python incremental_backup.py ./folder_B ./ripristino --restore")
         sys.exit(1)
 
     source = sys.argv[1]
     destination = sys.argv[2]
+
+    if "--restore" in sys.argv:
+        IncrementalBackup().restore(source, destination)
+        return
+
     incremental = "--full" not in sys.argv
+    delta_strategy = DELTA_ALWAYS if "--always-hash" in sys.argv else DELTA_TRUST_INCREMENTAL
+    workers = _parse_int_option(sys.argv, "--parallel", DEFAULT_WORKERS)
+    cdc = "--cdc" in sys.argv
+    concurrency = _parse_int_option(sys.argv, "--concurrency", DEFAULT_CONCURRENCY)
+
+    try:
+        backup = IncrementalBackup(delta_strategy, workers, cdc, concurrency)
+    except ValueError as e:
+        print(f"Errore: {e}")
+        sys.exit(1)
 
-    backup = IncrementalBackup()
     backup.backup(source, destination, incremental)
 
 
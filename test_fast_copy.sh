@@ -0,0 +1,78 @@
+#!/bin/bash
+# Script di verifica della copia dei file (_fast_copy e backup incrementale)
+# Non interattivo: termina con codice 1 al primo file copiato male
+
+cd "$(dirname "$0")"
+
+TMP=$(mktemp -d)
+trap 'rm -rf "$TMP"' EXIT
+# I metadati vengono salvati nella home: si usa una home temporanea
+export HOME="$TMP"
+
+ERRORI=0
+
+verifica() {
+    # verifica <descrizione> <file_atteso> <file_copiato>
+    if cmp -s "$2" "$3"; then
+        echo "   ✓ $1"
+    else
+        echo "   ✗ $1: DIFFERENTE"
+        ERRORI=1
+    fi
+}
+
+echo "1. File modificato con la stessa dimensione..."
+mkdir -p "$TMP/src"
+head -c 3000000 /dev/urandom > "$TMP/src/grande.bin"
+echo "Contenuto AAAA" > "$TMP/src/piccolo.txt"
+python3 incremental_backup.py "$TMP/src" "$TMP/dst" > /dev/null
+
+# Stessa dimensione, data di modifica diversa
+head -c 3000000 /dev/urandom > "$TMP/src/grande.bin"
+echo "Contenuto BBBB" > "$TMP/src/piccolo.txt"
+touch -d "+1 minute" "$TMP/src/grande.bin" "$TMP/src/piccolo.txt"
+python3 incremental_backup.py "$TMP/src" "$TMP/dst" > /dev/null
+verifica "incrementale, data cambiata: grande.bin" "$TMP/src/grande.bin" "$TMP/dst/grande.bin"
+verifica "incrementale, data cambiata: piccolo.txt" "$TMP/src/piccolo.txt" "$TMP/dst/piccolo.txt"
+
+# Stessa dimensione e stessa data: solo --full può accorgersene
+touch -r "$TMP/src/piccolo.txt" "$TMP/rif"
+echo "Contenuto CCCC" > "$TMP/src/piccolo.txt"
+touch -r "$TMP/rif" "$TMP/src/piccolo.txt"
+python3 incremental_backup.py "$TMP/src" "$TMP/dst" --full > /dev/null
+verifica "completo, data preservata: piccolo.txt" "$TMP/src/piccolo.txt" "$TMP/dst/piccolo.txt"
+echo ""
+
+echo "2. Ripiego quando la copia nel kernel non copia nulla..."
+python3 - "$TMP/src/grande.bin" "$TMP" <<'EOF'
+import os
+import sys
+
+import incremental_backup
+
+src, tmp = sys.argv[1], sys.argv[2]
+
+# Alcuni filesystem virtuali restituiscono 0 invece di un errore
+casi = {
+    "copy_file_range_zero": {"copy_file_range": lambda *args: 0},
+    "sendfile_zero": {"copy_file_range": lambda *args: 0, "sendfile": lambda *args: 0},
+}
+for nome, sostituti in casi.items():
+    originali = {attr: getattr(os, attr) for attr in sostituti if hasattr(os, attr)}
+    for attr, funzione in sostituti.items():
+        setattr(os, attr, funzione)
+    try:
+        incremental_backup._copy_file(src, os.path.join(tmp, nome))
+    finally:
+        for attr, funzione in originali.items():
+            setattr(os, attr, funzione)
+EOF
+verifica "copy_file_range restituisce 0" "$TMP/src/grande.bin" "$TMP/copy_file_range_zero"
+verifica "copy_file_range e sendfile restituiscono 0" "$TMP/src/grande.bin" "$TMP/sendfile_zero"
+echo ""
+
+if [ $ERRORI -ne 0 ]; then
+    echo "VERIFICA FALLITA"
+    exit 1
+fi
+echo "VERIFICA COMPLETATA!"